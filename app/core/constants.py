@@ -239,6 +239,7 @@ class BudgetStatus(str, Enum):
     PAUSED = "paused"
     COMPLETED = "completed"
     ARCHIVED = "archived"
+    OVERBUDGET = "overbudget"
 
 class BudgetPeriod(str, Enum):
     WEEKLY = "weekly"
@@ -454,6 +455,17 @@ class CacheKeys(str, Enum):
 
 
 
+# =============================================================================
+# MOBILE DEVICES
+# =============================================================================
+
+class DevicePlatform(IntEnum):
+    """Mobile client platforms (stored as small ints in the device registry)"""
+    OTHER = 0
+    IOS = 1
+    ANDROID = 2
+
+
 # =============================================================================
 # HTTP & gRPC STATUS CODES
 # =============================================================================
@@ -602,6 +614,21 @@ AI_ADVICE_TOPICS: Set[str] = {
     "living_below_means", "financial_goals_setting"
 }
 
+# Emotion valence: the single definition of positive/negative emotion_checkin values.
+# EmotionLogService classifies with these sets; EmotionLog.is_positive_emotion and
+# is_negative_emotion must read them too rather than keep their own lists.
+POSITIVE_EMOTIONS: Set[str] = {
+    "happy", "excited", "grateful", "motivated", "calm", "content",
+    "relaxed", "relieved", "satisfied", "peaceful", "joyful", "hopeful",
+    "amazed", "confident", "enthusiastic"
+}
+
+NEGATIVE_EMOTIONS: Set[str] = {
+    "sad", "anxious", "stressed", "overwhelmed", "annoyed", "angry",
+    "guilty", "jealous", "embarrassed", "disappointed", "disgusted",
+    "furious", "depressed", "hopeless", "lonely", "tired"
+}
+
 # Spending Analysis Thresholds (Stricter for financial education)
 SPENDING_ANALYSIS: Dict[str, Dict[str, float]] = {
     "high_expense_warning": {"amount": 2_000_000},  # 500K VND - warn for large expenses
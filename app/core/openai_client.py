@@ -0,0 +1,22 @@
+"""
+Shared OpenAI HTTP clients
+One tuned connection pool per process, reused by every ChatOpenAI instance
+"""
+import httpx
+
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+SHARED_ASYNC_CLIENT = httpx.AsyncClient(limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+SHARED_SYNC_CLIENT = httpx.Client(limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+
+
+def openai_http_clients() -> dict:
+    """Keyword arguments that route a ChatOpenAI instance through the shared pools"""
+    return {"http_async_client": SHARED_ASYNC_CLIENT, "http_client": SHARED_SYNC_CLIENT}
+
+
+async def close_openai_clients():
+    """Close the shared pools on server shutdown"""
+    await SHARED_ASYNC_CLIENT.aclose()
+    SHARED_SYNC_CLIENT.close()
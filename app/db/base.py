@@ -1,11 +1,14 @@
 #Database base utilities for Supabase
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timezone
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per multi-row INSERT request; keeps request bodies well under PostgREST limits.
+BULK_INSERT_CHUNK_SIZE = 500
+
 class DatabaseError(Exception):
     pass
 
@@ -56,6 +59,18 @@ def prepare_record_for_update(data: Dict[str, Any]) -> Dict[str, Any]:
     record.pop('created_at', None)
     return record
 
+def bulk_insert(client, table: str, rows: List[Dict[str, Any]],
+                chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Insert rows with one multi-row request per chunk instead of one request per row.
+
+    Every row must carry the same keys: PostgREST takes the column list from the payload.
+    """
+    inserted: List[Dict[str, Any]] = []
+    for start in range(0, len(rows), chunk_size):
+        result = client.table(table).insert(rows[start:start + chunk_size]).execute()
+        inserted.extend(result.data or [])
+    return inserted
+
 def handle_supabase_error(func):
     """Decorator to handle Supabase errors"""
     def wrapper(*args, **kwargs):
@@ -1,43 +1,72 @@
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 from app.core.settings import get_settings
-from typing import Optional
+from functools import lru_cache
+from typing import Dict
+import importlib.util
+import httpx
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-_supabase_client: Optional[Client] = None
-_supabase_admin_client: Optional[Client] = None
+# HTTP/2 needs the optional httpx[http2] extra (h2); plain HTTP/1.1 keep-alive is the fallback
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
+# Pool sizing shared by every Supabase client; the sessions themselves are not shared
+_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+_http_clients: Dict[str, httpx.Client] = {}
+
+def get_http_client(role: str) -> httpx.Client:
+    """Keep-alive session (HTTP/2 when h2 is installed) for one Supabase client role ("anon" or "service_role")
+
+    Each role gets its own session: postgrest/storage write base_url and auth headers
+    onto the session they are given, so a shared one would leak credentials across roles.
+    """
+    http_client = _http_clients.get(role)
+    if http_client is None:
+        http_client = _http_clients[role] = httpx.Client(http2=HTTP2_AVAILABLE, limits=_POOL_LIMITS)
+    return http_client
+
+def _client_options(role: str) -> SyncClientOptions:
+    return SyncClientOptions(httpx_client=get_http_client(role))
+
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Get or create Supabase client instance with connection reuse"""
-    global _supabase_client
-    if _supabase_client is None:
-        try:
-            _supabase_client = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_ANON_KEY
-            )
-            logger.info("Supabase client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {e}")
-            raise
-    return _supabase_client
+    """Get or create the shared Supabase client instance (one per process)"""
+    try:
+        client = create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_ANON_KEY,
+            options=_client_options("anon"),
+        )
+        logger.info("Supabase client initialized successfully")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase client: {e}")
+        raise
 
+@lru_cache(maxsize=1)
 def get_supabase_admin_client() -> Client:
     """Get Supabase client with service role key for admin operations"""
-    global _supabase_admin_client
-    if _supabase_admin_client is None:
-        try:
-            _supabase_admin_client = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_SERVICE_ROLE_KEY
-            )
-            logger.info("Supabase admin client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Supabase admin client: {e}")
-            raise
-    return _supabase_admin_client
+    try:
+        client = create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_SERVICE_ROLE_KEY,
+            options=_client_options("service_role"),
+        )
+        logger.info("Supabase admin client initialized successfully")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase admin client: {e}")
+        raise
+
+def __getattr__(name: str):
+    """Lazy module attribute: `from app.db.supabase_client import client` yields the shared client"""
+    if name == "client":
+        return get_supabase_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def health_check() -> bool:
     """Check if Supabase connection is healthy"""
@@ -52,9 +81,11 @@ def health_check() -> bool:
 
 def reset_connections():
     """Reset connection instances (useful for testing)"""
-    global _supabase_client, _supabase_admin_client
-    _supabase_client = None
-    _supabase_admin_client = None
+    get_supabase_client.cache_clear()
+    get_supabase_admin_client.cache_clear()
+    for http_client in _http_clients.values():
+        http_client.close()
+    _http_clients.clear()
 
 def login_with_google(redirect_url: str) -> dict:
     """Initiate Google OAuth login/signup"""
@@ -14,6 +14,7 @@ from grpc_reflection.v1alpha import reflection
 
 from app.core.settings import get_settings
 from app.core.logging import setup_logging
+from app.core.openai_client import close_openai_clients
 from app.grpc_services.grpc_server import GrpcServer
 from app.grpc_services.user_grpc_service import UserServicer
 from app.grpc_services.transaction_grpc_service import TransactionServicer
@@ -126,6 +127,7 @@ class SpendyWiseGrpcServer:
             logger.info("Shutting down gRPC server...")
             await self.server.stop(grace_period)
             logger.info("gRPC server stopped")
+        await close_openai_clients()
 
 
 async def main():
@@ -149,5 +151,16 @@ async def main():
         sys.exit(1)
 
 
+def install_event_loop_policy():
+    """Use uvloop's libuv-based event loop when available"""
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop not installed, using default asyncio event loop")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
 if __name__ == "__main__":
+    install_event_loop_policy()
     asyncio.run(main())
@@ -3,12 +3,15 @@ Mobile Device Manager - gRPC Service Implementation
 Optimized for battery life and data usage
 """
 import asyncio
-import gzip
+import base64
+import hashlib
 import json
 import logging
+import secrets
+import sys
 import time
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, AsyncGenerator
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, AsyncGenerator
 
 import grpc
 from google.protobuf import empty_pb2, timestamp_pb2
@@ -18,6 +21,7 @@ from app.generated import mobile_pb2
 from app.generated import mobile_pb2_grpc
 
 from app.core.settings import get_settings, MobileConfig
+from app.core.constants import DevicePlatform
 from app.db.session import get_async_db
 from app.models.user import User
 from app.utils.push_notifications import PushNotificationManager
@@ -26,6 +30,86 @@ from app.core.auth import verify_token
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+_PLATFORMS = {
+    "ios": DevicePlatform.IOS,
+    "android": DevicePlatform.ANDROID,
+}
+
+# Upper bound on records per streamed sync chunk
+SYNC_CHUNK_MAX_RECORDS = 256
+
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+
+def _serialize_records(records: List[dict]) -> bytes:
+    """Encode a batch of sync records as JSON"""
+    if orjson is not None:
+        return orjson.dumps(records)
+    return json.dumps(records).encode('utf-8')
+
+
+# Verified-token cache: clients reuse one JWT across register/push/sync bursts
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_SIZE = 10_000
+_token_cache: Dict[bytes, tuple] = {}
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """Read the exp claim of an already-verified JWT"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def _verify_token_cached(token: str):
+    """verify_token with a short TTL cache that never outlives the token's exp"""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at > now:
+            return user
+        del _token_cache[key]
+    
+    user = await verify_token(token)
+    if user:
+        expires_at = now + TOKEN_CACHE_TTL_SECONDS
+        token_exp = _token_expiry(token)
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            del _token_cache[next(iter(_token_cache))]
+        _token_cache[key] = (user, expires_at)
+    return user
+
+
+@dataclass(slots=True)
+class DeviceRecord:
+    """Registered device state kept in the in-memory registry (timestamps are epoch seconds)"""
+    user_id: int
+    device_id: str
+    platform: DevicePlatform
+    app_version: str
+    os_version: str
+    device_model: str
+    timezone: str
+    locale: str
+    push_enabled: bool
+    last_active: int
+    registered_at: int
+    push_token: Optional[str] = None
+    push_platform: Optional[str] = None
+    push_registered_at: Optional[int] = None
+    last_sync: Optional[int] = None
+
 
 class MobileDeviceManager:
     """
@@ -35,36 +119,39 @@ class MobileDeviceManager:
     
     def __init__(self):
         self.push_manager = PushNotificationManager()
-        self.active_streams: Dict[str, List[grpc.aio.StreamStreamCall]] = {}
-        self.device_registry: Dict[str, dict] = {}
+        self.active_streams: Dict[str, Set[grpc.aio.StreamStreamCall]] = {}
+        self.device_registry: Dict[str, DeviceRecord] = {}
         
     async def RegisterDevice(self, request, context):
         """Register a new mobile device"""
         try:
             # Verify user token
-            user = await verify_token(request.user_token)
+            user = await _verify_token_cached(request.user_token)
             if not user:
                 context.set_code(grpc.StatusCode.UNAUTHENTICATED)
                 context.set_details("Invalid user token")
                 return
             
-            # Generate device token
-            device_token = f"device_{user.id}_{request.device_info.device_id}_{int(time.time())}"
+            # Generate opaque device token (user/device ids live on the record)
+            device_token = secrets.token_urlsafe(16)
             
-            # Store device info
-            device_data = {
-                "user_id": user.id,
-                "device_id": request.device_info.device_id,
-                "platform": request.device_info.platform,
-                "app_version": request.device_info.app_version,
-                "os_version": request.device_info.os_version,
-                "device_model": request.device_info.device_model,
-                "timezone": request.device_info.timezone,
-                "locale": request.device_info.locale,
-                "push_enabled": request.device_info.push_enabled,
-                "last_active": datetime.now(timezone.utc),
-                "registered_at": datetime.now(timezone.utc)
-            }
+            # Store device info (low-cardinality strings are interned, platform stored as int)
+            device_info = request.device_info
+            platform = _PLATFORMS.get(device_info.platform.lower(), DevicePlatform.OTHER)
+            now = int(time.time())
+            device_data = DeviceRecord(
+                user_id=user.id,
+                device_id=device_info.device_id,
+                platform=platform,
+                app_version=sys.intern(device_info.app_version),
+                os_version=sys.intern(device_info.os_version),
+                device_model=sys.intern(device_info.device_model),
+                timezone=sys.intern(device_info.timezone),
+                locale=sys.intern(device_info.locale),
+                push_enabled=device_info.push_enabled,
+                last_active=now,
+                registered_at=now
+            )
             
             self.device_registry[device_token] = device_data
             
@@ -74,7 +161,7 @@ class MobileDeviceManager:
                 pass
             
             # Return response with optimized sync interval
-            sync_interval = self._calculate_sync_interval(request.device_info.platform)
+            sync_interval = self._calculate_sync_interval(platform)
             
             return mobile_pb2.DeviceRegistrationResponse(
                 success=True,
@@ -106,9 +193,9 @@ class MobileDeviceManager:
             )
             
             if success:
-                device_data["push_token"] = request.push_token
-                device_data["push_platform"] = request.platform
-                device_data["push_registered_at"] = datetime.now(timezone.utc)
+                device_data.push_token = request.push_token
+                device_data.push_platform = request.platform
+                device_data.push_registered_at = int(time.time())
             
             return mobile_pb2.PushTokenResponse(
                 success=success,
@@ -134,10 +221,8 @@ class MobileDeviceManager:
                 return
             
             # Add to active streams
-            user_id = device_data["user_id"]
-            if user_id not in self.active_streams:
-                self.active_streams[user_id] = []
-            self.active_streams[user_id].append(context)
+            user_id = device_data.user_id
+            self.active_streams.setdefault(user_id, set()).add(context)
             
             try:
                 # Send initial data
@@ -172,23 +257,21 @@ class MobileDeviceManager:
                     
             finally:
                 # Clean up stream
-                if user_id in self.active_streams:
-                    try:
-                        self.active_streams[user_id].remove(context)
-                        if not self.active_streams[user_id]:
-                            del self.active_streams[user_id]
-                    except ValueError:
-                        pass
+                streams = self.active_streams.get(user_id)
+                if streams is not None:
+                    streams.discard(context)
+                    if not streams:
+                        del self.active_streams[user_id]
                         
         except Exception as e:
             logger.error(f"Streaming error: {e}")
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
     
-    async def GetSyncData(self, request, context):
+    async def GetSyncData(self, request, context) -> AsyncGenerator:
         """
-        Get compressed sync data for battery optimization
-        Uses binary protocol with gzip compression
+        Stream sync data in bounded chunks for battery optimization
+        Records are piped to the wire as they are read; compression is per-message
         """
         try:
             device_data = self.device_registry.get(request.device_token)
@@ -197,32 +280,29 @@ class MobileDeviceManager:
                 context.set_details("Device not found")
                 return
             
-            user_id = device_data["user_id"]
+            user_id = device_data.user_id
+            if request.compressed:
+                context.set_compression(grpc.Compression.Gzip)
             
-            # Get data since last sync
-            sync_data = await self._get_sync_data(
-                user_id, 
-                request.last_sync, 
-                request.data_types
-            )
+            # Taken before reading so rows committed mid-stream fall after the client's next last_sync
+            sync_timestamp = timestamp_pb2.Timestamp()
+            sync_timestamp.GetCurrentTime()
             
-            # Compress data if requested
-            if request.compressed:
-                json_data = json.dumps(sync_data).encode('utf-8')
-                compressed_data = gzip.compress(json_data)
-            else:
-                compressed_data = json.dumps(sync_data).encode('utf-8')
+            batch = []
+            sent_chunk = False
+            # Stream data since last sync
+            async for record in self._iter_sync_records(user_id, request.last_sync, request.data_types):
+                batch.append(record)
+                if len(batch) >= SYNC_CHUNK_MAX_RECORDS:
+                    yield self._build_sync_chunk(batch, sync_timestamp)
+                    sent_chunk = True
+                    batch = []
+            if batch or not sent_chunk:
+                # Nothing changed still gets one empty chunk, so the client receives the new watermark
+                yield self._build_sync_chunk(batch, sync_timestamp)
             
             # Update last sync time
-            device_data["last_sync"] = datetime.now(timezone.utc)
-            
-            return mobile_pb2.SyncResponse(
-                compressed_data=compressed_data,
-                sync_timestamp=timestamp_pb2.Timestamp(),
-                total_records=len(sync_data.get('records', [])),
-                more_data_available=len(sync_data.get('records', [])) >= 1000,
-                next_page_token=sync_data.get('next_page_token', '')
-            )
+            device_data.last_sync = sync_timestamp.seconds
             
         except Exception as e:
             logger.error(f"Sync error: {e}")
@@ -247,7 +327,7 @@ class MobileDeviceManager:
             for operation in request.operations:
                 try:
                     result = await self._process_batch_operation(
-                        device_data["user_id"], 
+                        device_data.user_id, 
                         operation
                     )
                     results.append(mobile_pb2.BatchResult(
@@ -286,10 +366,10 @@ class MobileDeviceManager:
         )
     
     # Helper methods
-    def _calculate_sync_interval(self, platform: str) -> int:
+    def _calculate_sync_interval(self, platform: DevicePlatform) -> int:
         """Calculate optimal sync interval based on platform"""
         base_interval = 300  # 5 minutes
-        if platform.lower() == "ios":
+        if platform == DevicePlatform.IOS:
             return base_interval + 60  # iOS background processing
         return base_interval
     
@@ -303,10 +383,20 @@ class MobileDeviceManager:
         # Implementation would check for changes
         return []
     
-    async def _get_sync_data(self, user_id: int, last_sync, data_types: List[str]) -> dict:
-        """Get sync data since last sync"""
-        # Implementation would fetch incremental data
-        return {"records": [], "next_page_token": ""}
+    async def _iter_sync_records(self, user_id: int, last_sync, data_types: List[str]) -> AsyncGenerator:
+        """Yield records changed since last sync"""
+        # Implementation would iterate a database cursor
+        for record in ():
+            yield record
+    
+    def _build_sync_chunk(self, records: List[dict], sync_timestamp):
+        """Serialize a batch of records into a SyncChunk stamped with the sync start time"""
+        # Inline: encoding is GIL-bound and chunks are bounded, so a thread hop buys nothing
+        return mobile_pb2.SyncChunk(
+            data=_serialize_records(records) if records else b"",
+            record_count=len(records),
+            sync_timestamp=sync_timestamp
+        )
     
     async def _process_batch_operation(self, user_id: int, operation) -> bytes:
         """Process a single batch operation"""
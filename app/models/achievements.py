@@ -1,13 +1,18 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, Literal
+from pydantic import BaseModel, ConfigDict, Field, with_config
+from typing import Optional, Literal
 from datetime import datetime, timezone
 from decimal import Decimal
 import uuid
+from typing_extensions import TypedDict
 from app.core.constants import AchievementType
-from supabase import Client
-from app.db.supabase_client import get_supabase_client
+from app.db.supabase_client import client as supabase
 
-supabase: Client = get_supabase_client()
+@with_config(ConfigDict(extra="allow"))
+class CriteriaSchema(TypedDict, total=False):
+    """Known achievement criteria keys; other keys are kept as-is"""
+    threshold_amount: Decimal
+    threshold_count: int
+    duration_days: int
 
 class Achievement(BaseModel):
     """Achievement model representing user achievements."""
@@ -15,30 +20,24 @@ class Achievement(BaseModel):
     achievement_type: AchievementType = Field(...)
     description: str = Field(...)
     category: str = Field(...)
-    criteria: Dict[str, Any] = Field(...)
+    criteria: CriteriaSchema = Field(...)
     points: Optional[int] = Field(default=0)
     threshold_amount: Optional[Decimal] = Field(default=None, ge=0, description="Threshold amount for achievement")
     threshold_count: Optional[int] = Field(default=None, ge=0, description="Threshold count for achievement")
     threshold_duration: Optional[int] = Field(default=None, ge=0, description="Threshold duration for achievement")
     google_play_achievement_id: Optional[str] = Field(default=None, description="Google Play achievement ID")
     is_locked: Optional[bool] = Field(default=True, description="Whether the achievement is locked")
-    created_at: datetime = Field(default=datetime.now(timezone.utc), description="Creation timestamp")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Creation timestamp")
     updated_at: Optional[datetime] = Field(default=None, description="Last update timestamp")
 
-    class Config:
-        from_attributes = True
-        arbitrary_types_allowed = True  # Handle Decimal and datetime
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            uuid.UUID: str,
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 class AchievementCreate(BaseModel):
     """Schema for creating a new achievement."""
     achievement_type: AchievementType = Field(..., description="Type of achievement")
     description: str = Field(..., description="Achievement description")
     category: str = Field(..., description="Achievement category")
-    criteria: Dict[str, Any] = Field(..., description="Criteria for achieving the goal")
+    criteria: CriteriaSchema = Field(..., description="Criteria for achieving the goal")
     points: int = Field(default=0, description="Points awarded for the achievement")
     threshold_amount: Optional[Decimal] = Field(default=None, ge=0, description="Threshold amount")
     threshold_count: Optional[int] = Field(default=None, ge=0, description="Threshold count")
@@ -51,7 +50,7 @@ class AchievementUpdate(BaseModel):
     achievement_type: Optional[AchievementType] = Field(default=None, description="Type of achievement")
     description: Optional[str] = Field(default=None, description="Achievement description")
     category: Optional[str] = Field(default=None, description="Achievement category")
-    criteria: Optional[Dict[str, Any]] = Field(default=None, description="Criteria for achieving the goal")
+    criteria: Optional[CriteriaSchema] = Field(default=None, description="Criteria for achieving the goal")
     points: Optional[int] = Field(default=None, description="Points awarded for the achievement")
     threshold_amount: Optional[Decimal] = Field(default=None, ge=0, description="Threshold amount")
     threshold_count: Optional[int] = Field(default=None, ge=0, description="Threshold count")
@@ -61,15 +60,14 @@ class AchievementUpdate(BaseModel):
 
 class AchievementResponse(Achievement):
     """Schema for achievement responses."""
-    pass
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 class AchievementModel:
     @staticmethod
     def create_achievement(data: AchievementCreate) -> Achievement:
         """Create a new achievement in the achievements table."""
-        achievement_data = data.model_dump(exclude_unset=True)
-        if "achievement_id" not in achievement_data or achievement_data["achievement_id"] is None:
-            achievement_data["achievement_id"] = str(uuid.uuid4())
+        # mode="json" so the Decimal criteria/threshold amounts reach PostgREST as JSON strings
+        achievement_data = data.model_dump(exclude_unset=True, mode="json")
         response = supabase.table("achievements").insert(achievement_data).execute()
         if response.data:
             return Achievement(**response.data[0])
@@ -78,7 +76,7 @@ class AchievementModel:
     @staticmethod
     def update_achievement(achievement_id: uuid.UUID, data: AchievementUpdate) -> Achievement:
         """Update an existing achievement in the achievements table."""
-        update_data = data.model_dump(exclude_unset=True, exclude_none=True)
+        update_data = data.model_dump(exclude_unset=True, exclude_none=True, mode="json")
         if not update_data:
             raise ValueError("No updates provided")
         response = supabase.table("achievements").update(update_data).eq("achievement_id", str(achievement_id)).execute()
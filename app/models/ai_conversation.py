@@ -1,13 +1,29 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, List
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Any, Optional, Dict, List
 from datetime import datetime, timezone
 import uuid
 import re
-from supabase import Client, PostgrestAPIError
-from app.core.constants import ConversationContext, AIResponseType, AI_RESPONSE_MAX_LENGTH
-from app.db.supabase_client import get_supabase_client
+from supabase import PostgrestAPIError
+from app.core.constants import ConversationContext, AIResponseType, AI_RESPONSE_MAX_LENGTH, DEFAULT_PAGE_SIZE
+from app.db.supabase_client import client as supabase
+from app.db.base import bulk_insert
 
-supabase: Client = get_supabase_client()
+_EXPENSE_CATEGORIES = ("food", "grocery", "transport", "entertainment", "other")
+_EMOTIONAL_KEYWORDS = ("stressed", "upset", "impulse", "bad mood")
+
+
+def _alternation(words) -> str:
+    """Build a regex alternation, longest words first so prefixes never shadow them"""
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# Single-pass scanner for expense amount, category and emotional keywords
+_EXPENSE_SCANNER = re.compile(
+    r'\$?(?P<amt>\d+\.?\d*)'
+    rf'|(?P<cat>{_alternation(_EXPENSE_CATEGORIES)})'
+    rf'|(?P<emo>{_alternation(_EMOTIONAL_KEYWORDS)})',
+    re.IGNORECASE
+)
 
 class AIConversation(BaseModel):
     conversation_id: uuid.UUID = Field(..., description="Conversation unique identifier")
@@ -22,13 +38,7 @@ class AIConversation(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Creation timestamp")
     updated_at: Optional[datetime] = Field(default=None, description="Last update timestamp")  # Added
 
-    class Config:
-        from_attributes = True
-        arbitrary_types_allowed = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            uuid.UUID: str,
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 class AIConversationBase(BaseModel):
     context: ConversationContext = Field(default=ConversationContext.GENERAL)
@@ -52,6 +62,10 @@ class AIConversationResponse(AIConversationBase):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: Optional[datetime] = Field(default=None)  # Added
 
+    def to_json(self) -> str:
+        """Serialize straight to JSON in pydantic-core for outbound responses."""
+        return self.model_dump_json()
+
 class ConversationAnalytics(AIConversationBase):
     total_conversations: int = Field(...)
     avg_confidence_score: Optional[float] = Field(default=None)
@@ -61,33 +75,96 @@ class ConversationAnalytics(AIConversationBase):
     improvement_areas: List[str] = Field(default=[])
     response_type_distribution: Dict[str, int] = Field(default={})
 
+class ConversationListResponse(BaseModel):
+    conversations: List[AIConversationResponse] = Field(default=[])
+    total_count: int = Field(...)
+    page: int = Field(default=1)
+    page_size: int = Field(default=DEFAULT_PAGE_SIZE)
+
+_CONV_TABLE = "ai_conversations"
+# Explicit projection: only the columns the models carry, never the JSON context blobs.
+_CONV_COLUMNS = ",".join(AIConversation.model_fields)
+
+def _conv():
+    """Fresh query builder for the ai_conversations table."""
+    return supabase.table(_CONV_TABLE)
+
+def _conversation_from_row(row: Dict[str, Any]) -> AIConversation:
+    """Rehydrate an AIConversation from a full trusted Supabase row without running validation."""
+    context = row.get("context")
+    response_type = row.get("response_type")
+    updated_at = row.get("updated_at")
+    return AIConversation.model_construct(
+        conversation_id=uuid.UUID(row["conversation_id"]),
+        user_id=uuid.UUID(row["user_id"]),
+        context=ConversationContext(context) if context else None,
+        user_message=row["user_message"],
+        ai_response=row["ai_response"],
+        response_type=AIResponseType(response_type) if response_type else None,
+        user_rating=row.get("user_rating"),
+        was_helpful=row.get("was_helpful"),
+        confidence_score=row.get("confidence_score"),
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+    )
+
+_CONV_LIST_ADAPTER = TypeAdapter(List[AIConversationResponse])
+_RESP_ADAPTER = TypeAdapter(AIConversationResponse)
+_LIST_RESP_ADAPTER = TypeAdapter(ConversationListResponse)
+
+def dump_conversation_json(conversation: AIConversationResponse) -> bytes:
+    """Serialize a conversation response to JSON with the prebuilt serializer."""
+    return _RESP_ADAPTER.dump_json(conversation)
+
+def dump_conversation_list_json(conversations: ConversationListResponse) -> bytes:
+    """Serialize a conversation list response to JSON with the prebuilt serializer."""
+    return _LIST_RESP_ADAPTER.dump_json(conversations)
+
 class AIConversationModel:
     @staticmethod
     def create_conversation(data: AIConversationCreate, user_id: uuid.UUID) -> AIConversation:
         """Create a new conversation in the ai_conversations table."""
         try:
-            conversation_data = data.model_dump(exclude_unset=True)
-            conversation_data["conversation_id"] = str(uuid.uuid4())
-            conversation_data["user_id"] = str(user_id)
-            conversation_data["created_at"] = datetime.now(timezone.utc).isoformat()
-            conversation_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+            now_iso = datetime.now(timezone.utc).isoformat()
+            conversation_data = {
+                **data.model_dump(exclude_unset=True, mode="json"),
+                "user_id": str(user_id),
+                "created_at": now_iso,
+                "updated_at": now_iso,
+            }
 
-            response = supabase.table("ai_conversations").insert(conversation_data).execute()
+            response = _conv().insert(conversation_data).execute()
             if not response.data:
                 raise ValueError("Failed to create conversation")
-            return AIConversation(**response.data[0])
+            return _conversation_from_row(response.data[0])
         except PostgrestAPIError as e:
             raise ValueError(f"Database error creating conversation: {str(e)}")
         except Exception as e:
             raise ValueError(f"Unexpected error creating conversation: {str(e)}")
 
+    @staticmethod
+    def create_conversations(items: List[AIConversationCreate], user_id: uuid.UUID) -> List[AIConversation]:
+        """Create many conversations with batched multi-row inserts (e.g. replaying a chat log)."""
+        try:
+            now_iso = datetime.now(timezone.utc).isoformat()
+            uid = str(user_id)
+            rows = [
+                {**item.model_dump(mode="json"), "user_id": uid, "created_at": now_iso, "updated_at": now_iso}
+                for item in items
+            ]
+            return [_conversation_from_row(row) for row in bulk_insert(supabase, _CONV_TABLE, rows)]
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error creating conversations: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error creating conversations: {str(e)}")
+
     @staticmethod
     def get_conversation(conversation_id: uuid.UUID) -> Optional[AIConversation]:
         """Fetch a single conversation by ID."""
         try:
-            response = supabase.table("ai_conversations").select("*").eq("conversation_id", str(conversation_id)).single().execute()
+            response = _conv().select(_CONV_COLUMNS).eq("conversation_id", str(conversation_id)).single().execute()
             if response.data:
-                return AIConversation(**response.data)
+                return _conversation_from_row(response.data)
             return None
         except PostgrestAPIError as e:
             if "single" in str(e).lower() and "0 rows" in str(e).lower():
@@ -96,19 +173,84 @@ class AIConversationModel:
         except Exception as e:
             raise ValueError(f"Unexpected error fetching conversation: {str(e)}")
 
+    @staticmethod
+    def get_conversation_fields(conversation_id: uuid.UUID, fields: str) -> Optional[Dict[str, Any]]:
+        """Fetch only `fields` (comma-separated columns) of a conversation as a raw row."""
+        try:
+            response = (_conv().select(fields)
+                        .eq("conversation_id", str(conversation_id)).maybe_single().execute())
+            return response.data if response and response.data else None
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error fetching conversation fields: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error fetching conversation fields: {str(e)}")
+
+    @staticmethod
+    def get_conversation_rating(conversation_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """Fetch only the feedback columns (user_rating, was_helpful) of a conversation."""
+        try:
+            response = (_conv().select("user_rating,was_helpful")
+                        .eq("conversation_id", str(conversation_id)).maybe_single().execute())
+            return response.data if response and response.data else None
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error fetching conversation rating: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error fetching conversation rating: {str(e)}")
+
+    @staticmethod
+    def list_conversations(user_id: uuid.UUID, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> List[AIConversationResponse]:
+        """Fetch a user's most recent conversations."""
+        try:
+            response = (_conv()
+                        .select(_CONV_COLUMNS)
+                        .eq("user_id", str(user_id))
+                        .order("created_at", desc=True)
+                        .range(offset, offset + limit - 1)
+                        .execute())
+            return _CONV_LIST_ADAPTER.validate_python(response.data or [])
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error listing conversations: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error listing conversations: {str(e)}")
+
+    @staticmethod
+    def count_conversations(user_id: uuid.UUID) -> int:
+        """Count a user's conversations without transferring any rows."""
+        try:
+            response = (_conv()
+                        .select("conversation_id", count="exact", head=True)
+                        .eq("user_id", str(user_id))
+                        .execute())
+            return response.count or 0
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error counting conversations: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error counting conversations: {str(e)}")
+
+    @staticmethod
+    def get_conversation_list(user_id: uuid.UUID, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> ConversationListResponse:
+        """Fetch one page of a user's conversations with the total count."""
+        conversations = AIConversationModel.list_conversations(user_id, limit=page_size, offset=(page - 1) * page_size)
+        return ConversationListResponse(
+            conversations=conversations,
+            total_count=AIConversationModel.count_conversations(user_id),
+            page=page,
+            page_size=page_size
+        )
+
     @staticmethod
     def update_conversation_feedback(conversation_id: uuid.UUID, feedback: AIConversationUpdate) -> AIConversation:
         """Update feedback for a conversation."""
         try:
-            update_data = feedback.model_dump(exclude_unset=True, exclude_none=True)
+            update_data = feedback.model_dump(exclude_unset=True, exclude_none=True, mode="json")
             if not update_data:
                 raise ValueError("No feedback provided")
             update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-            response = supabase.table("ai_conversations").update(update_data).eq("conversation_id", str(conversation_id)).execute()
+            response = _conv().update(update_data).eq("conversation_id", str(conversation_id)).execute()
             if not response.data:
                 raise ValueError(f"Conversation with ID {conversation_id} not found")
-            return AIConversation(**response.data[0])
+            return _conversation_from_row(response.data[0])
         except PostgrestAPIError as e:
             raise ValueError(f"Database error updating feedback: {str(e)}")
         except Exception as e:
@@ -118,51 +260,53 @@ class AIConversationModel:
     def extract_and_record_expense(user_message: str, conversation_id: uuid.UUID, user_id: str) -> Dict:
         """Extracts expense details from user message, records them in Supabase, and updates conversation."""
         try:
-            # Basic regex to extract amount, category, and description
-            amount_match = re.search(r'\$?(\d+\.?\d*)', user_message)
-            category_match = re.search(r'(food|grocery|transport|entertainment|other)', user_message.lower())
+            # Scan once for amount, category, and emotional keywords
+            amount_text = None
+            category = None
+            has_emotion = False
+            for match in _EXPENSE_SCANNER.finditer(user_message):
+                kind = match.lastgroup
+                if kind == "amt":
+                    if amount_text is None:
+                        amount_text = match.group("amt")
+                elif kind == "cat":
+                    if category is None:
+                        category = match.group("cat").lower()
+                else:
+                    has_emotion = True
+                if amount_text is not None and category is not None and has_emotion:
+                    break
             description = user_message[:100]
 
-            if not amount_match:
+            if amount_text is None:
                 return {
                     "status": "error",
                     "message": "Could not identify expense amount. Please clarify (e.g., 'I spent $30 on groceries')."
                 }
 
-            amount = float(amount_match.group(1))
-            category = category_match.group(1) if category_match else "other"
-
-            # Record expense in 'expenses' table
-            expense = {
-                "user_id": user_id,
-                "amount": amount,
-                "category": category,
-                "description": description,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "conversation_id": str(conversation_id)
-            }
-            expense_response = supabase.table("expenses").insert(expense).execute()
-
-            if not expense_response.data:
-                return {"status": "error", "message": "Failed to record expense. Please try again."}
+            amount = float(amount_text)
+            category = category or "other"
 
-            # Update conversation with AI response
+            # Record expense and update conversation with AI response in one transaction
             ai_response = f"Recorded expense: ${amount} on {category} ({description}). Anything else you'd like to share about your day or spending?"
-            conversation_update = {
-                "ai_response": ai_response,
-                "response_type": AIResponseType.ADVICE.value,
-                "context": ConversationContext.FINANCIAL.value,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
-            conversation_response = supabase.table("ai_conversations").update(conversation_update).eq("conversation_id", str(conversation_id)).execute()
+            response = supabase.rpc("record_expense_and_update_conv", {
+                "p_user_id": user_id,
+                "p_conversation_id": str(conversation_id),
+                "p_amount": amount,
+                "p_category": category,
+                "p_description": description,
+                "p_ai_response": ai_response,
+                "p_response_type": AIResponseType.ADVICE.value,
+                "p_context": ConversationContext.FINANCIAL.value
+            }).execute()
 
-            if not conversation_response.data:
-                return {"status": "error", "message": "Failed to update conversation. Expense recorded, but response not saved."}
+            expense = response.data
+            if not expense:
+                return {"status": "error", "message": "Failed to record expense. Conversation not found, nothing was saved."}
 
             # Check for emotional context
-            emotional_keywords = ["stressed", "upset", "impulse", "bad mood"]
             emotional_advice = ""
-            if any(keyword in user_message.lower() for keyword in emotional_keywords):
+            if has_emotion:
                 emotional_advice = (
                     "It sounds like you might be feeling stressed. Try taking a moment to breathe deeply or "
                     "reflect before making more purchases. Would you like tips to manage impulse spending?"
@@ -182,11 +326,10 @@ class AIConversationModel:
     def get_conversation_analytics(user_id: uuid.UUID) -> ConversationAnalytics:
         """Compute analytics for a user's conversations."""
         try:
-            response = supabase.table("ai_conversations").select("*").eq("user_id", str(user_id)).execute()
-            conversations = response.data or []
-            total_conversations = len(conversations)
+            response = supabase.rpc("conversation_analytics", {"p_user_id": str(user_id)}).execute()
+            row = response.data[0] if response.data else None
 
-            if not conversations:
+            if not row or not row["total_conversations"]:
                 return ConversationAnalytics(
                     total_conversations=0,
                     user_message="",
@@ -194,25 +337,13 @@ class AIConversationModel:
                     context=ConversationContext.GENERAL
                 )
 
-            confidence_scores = [c["confidence_score"] for c in conversations if c["confidence_score"] is not None]
-            user_ratings = [c["user_rating"] for c in conversations if c["user_rating"] is not None]
-            helpful_responses = [c for c in conversations if c["was_helpful"] is True]
-            contexts = [c["context"] for c in conversations if c["context"] is not None]
-            response_types = [c["response_type"] for c in conversations if c["response_type"] is not None]
-
-            avg_confidence_score = sum(confidence_scores) / len(confidence_scores) if confidence_scores else None
-            avg_user_rating = sum(user_ratings) / len(user_ratings) if user_ratings else None
-            helpfulness_rate = len(helpful_responses) / total_conversations if total_conversations else None
-            most_common_contexts = list(set(contexts))[:3]  # Top 3 contexts
-            response_type_distribution = {rt: response_types.count(rt) for rt in set(response_types)}
-
             return ConversationAnalytics(
-                total_conversations=total_conversations,
-                avg_confidence_score=avg_confidence_score,
-                avg_user_rating=avg_user_rating,
-                helpfulness_rate=helpfulness_rate,
-                most_common_contexts=most_common_contexts,
-                response_type_distribution=response_type_distribution,
+                total_conversations=row["total_conversations"],
+                avg_confidence_score=row["avg_confidence_score"],
+                avg_user_rating=row["avg_user_rating"],
+                helpfulness_rate=row["helpfulness_rate"],
+                most_common_contexts=row["most_common_contexts"] or [],
+                response_type_distribution=row["response_type_distribution"] or {},
                 user_message="Analytics computed",
                 response_type=AIResponseType.ANALYTICS,
                 context=ConversationContext.GENERAL
@@ -1,13 +1,18 @@
 from pydantic import BaseModel, Field
 from decimal import Decimal
 from datetime import date, datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import uuid
 from app.core.constants import BudgetStatus
-from supabase import Client, PostgrestAPIError
-from app.db.supabase_client import get_supabase_client
+from supabase import PostgrestAPIError
+from app.db.supabase_client import client as supabase
+from app.db.base import bulk_insert
 
-supabase: Client = get_supabase_client()
+_UTC = timezone.utc
+
+def _utc_now_iso() -> str:
+    """Current UTC time as the ISO string Supabase expects."""
+    return datetime.now(_UTC).isoformat()
 
 class Budget(BaseModel):
     budget_id: uuid.UUID = Field(default_factory=uuid.uuid4, description="Unique budget identifier")
@@ -19,16 +24,13 @@ class Budget(BaseModel):
     end_date: Optional[date] = Field(default=None, description="End date of the budget period")
     status: BudgetStatus = Field(default=BudgetStatus.ACTIVE, description="Budget status")
     alert_threshold: int = Field(default=80, ge=0, le=100, description="Alert threshold percentage")
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(_UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(_UTC))
     category_id: Optional[uuid.UUID] = Field(default=None, description="Expense category ID")
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            uuid.UUID: str,
-            Decimal: str,
-        }
+    def to_json(self) -> str:
+        """Serialize straight to JSON in pydantic-core for outbound responses."""
+        return self.model_dump_json()
 
 class BudgetCreate(BaseModel):
     user_id: uuid.UUID
@@ -50,53 +52,75 @@ class BudgetUpdate(BaseModel):
     alert_threshold: Optional[int] = Field(default=None, ge=0, le=100)
     category_id: Optional[uuid.UUID] = Field(default=None)
 
+def _budget_from_row(row: Dict[str, Any]) -> Budget:
+    """Rehydrate a Budget from a trusted Supabase row without running validation."""
+    end_date = row.get("end_date")
+    category_id = row.get("category_id")
+    return Budget.model_construct(
+        budget_id=uuid.UUID(row["budget_id"]),
+        user_id=uuid.UUID(row["user_id"]),
+        name=row["name"],
+        amount=Decimal(str(row["amount"])),
+        spent_amount=Decimal(str(row.get("spent_amount") or 0)),
+        start_date=date.fromisoformat(row["start_date"][:10]),
+        end_date=date.fromisoformat(end_date[:10]) if end_date else None,
+        status=BudgetStatus(row["status"]),
+        alert_threshold=row["alert_threshold"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        category_id=uuid.UUID(category_id) if category_id else None,
+    )
 
-
+def _new_budget_row(data: BudgetCreate, now_iso: str) -> Dict[str, Any]:
+    """Insert payload for a new budget; mode="json" renders Decimal/date/UUID fields in one pass."""
+    return {
+        **data.model_dump(mode="json"),
+        "budget_id": str(uuid.uuid4()),
+        "spent_amount": "0",
+        "created_at": now_iso,
+        "updated_at": now_iso,
+    }
 
 class BudgetModel:
     @staticmethod
     def create_budget(data: BudgetCreate) -> Budget:
         """Create a new budget in the budgets table."""
         try:
-            budget_data = data.model_dump(exclude_unset=True)
-            budget_data["budget_id"] = str(uuid.uuid4())
-            budget_data["created_at"] = datetime.now(timezone.utc).isoformat()
-            budget_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-            budget_data["amount"] = str(budget_data["amount"])
-            budget_data["spent_amount"] = str(budget_data.get("spent_amount", "0"))
-            budget_data["start_date"] = budget_data["start_date"].isoformat()
-            budget_data["end_date"] = budget_data["end_date"].isoformat() if budget_data["end_date"] else None
-
+            budget_data = _new_budget_row(data, _utc_now_iso())
             response = supabase.table("budgets").insert(budget_data).execute()
             if not response.data:
                 raise ValueError("Failed to create budget")
-            return Budget(**response.data[0])
+            return _budget_from_row(response.data[0])
         except PostgrestAPIError as e:
             raise ValueError(f"Database error creating budget: {str(e)}")
         except Exception as e:
             raise ValueError(f"Unexpected error creating budget: {str(e)}")
 
+    @staticmethod
+    def create_budgets(items: List[BudgetCreate]) -> List[Budget]:
+        """Create many budgets with batched multi-row inserts."""
+        try:
+            now_iso = _utc_now_iso()
+            rows = [_new_budget_row(item, now_iso) for item in items]
+            return [_budget_from_row(row) for row in bulk_insert(supabase, "budgets", rows)]
+        except PostgrestAPIError as e:
+            raise ValueError(f"Database error creating budgets: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Unexpected error creating budgets: {str(e)}")
+
     @staticmethod
     def update_budget(budget_id: uuid.UUID, data: BudgetUpdate) -> Budget:
         """Update an existing budget in the budgets table."""
         try:
-            update_data = data.model_dump(exclude_unset=True, exclude_none=True)
+            update_data = data.model_dump(exclude_unset=True, exclude_none=True, mode="json")
             if not update_data:
                 raise ValueError("No updates provided")
-            update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-            if "amount" in update_data:
-                update_data["amount"] = str(update_data["amount"])
-            if "spent_amount" in update_data:
-                update_data["spent_amount"] = str(update_data["spent_amount"])
-            if "start_date" in update_data:
-                update_data["start_date"] = update_data["start_date"].isoformat()
-            if "end_date" in update_data:
-                update_data["end_date"] = update_data["end_date"].isoformat() if update_data["end_date"] else None
+            update_data["updated_at"] = _utc_now_iso()
 
             response =  supabase.table("budgets").update(update_data).eq("budget_id", str(budget_id)).execute()
             if not response.data:
                 raise ValueError(f"Budget with ID {budget_id} not found")
-            return Budget(**response.data[0])
+            return _budget_from_row(response.data[0])
         except PostgrestAPIError as e:
             raise ValueError(f"Database error updating budget: {str(e)}")
         except Exception as e:
@@ -108,7 +132,7 @@ class BudgetModel:
         try:
             response = supabase.table("budgets").select("*").eq("budget_id", str(budget_id)).single().execute()
             if response.data:
-                return Budget(**response.data)
+                return _budget_from_row(response.data)
             return None
         except PostgrestAPIError as e:
             if "single" in str(e).lower() and "0 rows" in str(e).lower():
@@ -121,27 +145,13 @@ class BudgetModel:
     def update_spent_amount(budget_id: uuid.UUID, user_id: uuid.UUID) -> Budget:
         """Update spent_amount based on expenses in the budgets' category and period."""
         try:
-            budget = BudgetModel.get_budget(budget_id)
-            if not budget:
-                raise ValueError(f"Budget with ID {budget_id} not found")
-            query = supabase.table("expenses").select("amount").eq("user_id", str(user_id))
-            if budget.category_id:
-                query = query.eq("category_id", str(budget.category_id))
-            if budget.start_date:
-                query = query.gte("created_at", budget.start_date.isoformat())
-            if budget.end_date:
-                query = query.lte("created_at", budget.end_date.isoformat())
-            expenses = query.execute()
-            spent_amount = sum(Decimal(str(exp["amount"])) for exp in expenses.data)
-            update_data = {
-                "spent_amount": str(spent_amount),
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "status": BudgetStatus.OVERBUDGET.value if spent_amount > budget.amount else BudgetStatus.ACTIVE.value
-            }
-            response =  supabase.table("budgets").update(update_data).eq("budget_id", str(budget_id)).execute()
+            response = supabase.rpc("recalc_budget_spent", {
+                "p_budget_id": str(budget_id),
+                "p_user_id": str(user_id),
+            }).execute()
             if not response.data:
-                raise ValueError(f"Failed to update spent_amount for budget {budget_id}")
-            return Budget(**response.data[0])
+                raise ValueError(f"Budget with ID {budget_id} not found")
+            return _budget_from_row(response.data[0])
         except PostgrestAPIError as e:
             raise ValueError(f"Database error updating spent_amount: {str(e)}")
         except Exception as e:
@@ -1,9 +1,33 @@
 import uuid
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from functools import partial
+from typing import Dict, Any, List, NamedTuple, Optional
 from decimal import Decimal
 
-from pydantic import BaseModel, Field, UUID4
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter, UUID4, computed_field
+from app.db.supabase_client import client as supabase
+
+_UTC = timezone.utc
+_utcnow = partial(datetime.now, _UTC)
+
+
+class ProgressDelta(NamedTuple):
+    """Amount/count to add to one achievement's progress"""
+    amount: Decimal = Decimal('0')
+    count: int = 0
+
+
+class UserAchievementDTO(BaseModel):
+    """Detailed progress snapshot; serialized by pydantic-core instead of a hand-built dict"""
+    current_amount: float
+    current_count: int
+    current_streak: int
+    progress_percentage: float
+    progress: Dict[str, Any]
+    is_completed: bool
+    completed_at: Optional[datetime]
+    synced_to_google_play: bool
+    google_play_sync_at: Optional[datetime]
 
 
 class UserAchievement(BaseModel):
@@ -25,23 +49,45 @@ class UserAchievement(BaseModel):
     google_play_sync_at: Optional[datetime] = Field(None, description="Last sync timestamp with Google Play Games")
 
     # Metadata
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Creation timestamp")
-    updated_at: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc),
+    created_at: datetime = Field(default_factory=_utcnow, description="Creation timestamp")
+    updated_at: Optional[datetime] = Field(default_factory=_utcnow,
                                            description="Last update timestamp")
 
+    # Achievement thresholds, copied once from the parent achievement so progress checks stay in-process
+    _target_amount: Optional[Decimal] = PrivateAttr(default=None)
+    _target_count: Optional[int] = PrivateAttr(default=None)
+    # Float mirror of the amount threshold for comparisons; current_amount stays the Decimal of record
+    _target_amount_f: Optional[float] = PrivateAttr(default=None)
+    # One-slot memo for progress_percentage, keyed on every input it reads
+    _pct_cache_key: Optional[tuple] = PrivateAttr(default=None)
+    _pct_cache_val: float = PrivateAttr(default=0.0)
+
+    def set_targets(self, target_amount: Optional[Decimal] = None, target_count: Optional[int] = None) -> None:
+        """Cache the achievement's thresholds on this instance; non-positive values mean no target"""
+        self._target_amount = target_amount if target_amount and target_amount > 0 else None
+        self._target_count = target_count if target_count and target_count > 0 else None
+        self._target_amount_f = float(self._target_amount) if self._target_amount is not None else None
+
+    @computed_field(repr=False)
     @property
     def progress_percentage(self) -> float:
-        try:
-            target_amount = getattr(self, '_target_amount', None)
-            target_count = getattr(self, '_target_count', None)
-
-            if target_amount and target_amount > 0:
-                return min(100.0, (float(self.current_amount) / float(target_amount)) * 100)
-            elif target_count and target_count > 0:
-                return min(100.0, (self.current_count / target_count) * 100)
-            return 100.0 if self.is_completed else 0.0
-        except AttributeError:
-            return 0.0
+        key = (self.current_amount, self.current_count, self._target_amount, self._target_count,
+               self.is_completed)
+        if key != self._pct_cache_key:
+            self._pct_cache_val = self._compute_progress_percentage()
+            self._pct_cache_key = key
+        return self._pct_cache_val
+
+    def _compute_progress_percentage(self) -> float:
+        target_amount_f = self._target_amount_f
+        if target_amount_f is not None:
+            pct = float(self.current_amount) / target_amount_f * 100.0
+            return 100.0 if pct >= 100.0 else pct
+        target_count = self._target_count
+        if target_count is not None:
+            pct = self.current_count / target_count * 100.0
+            return 100.0 if pct >= 100.0 else pct
+        return 100.0 if self.is_completed else 0.0
 
     def update_progress(self, amount: Optional[Decimal] = None, count: Optional[int] = None,
                         streak: Optional[int] = None, progress_data: Optional[Dict[str, Any]] = None) -> bool:
@@ -65,57 +111,100 @@ class UserAchievement(BaseModel):
             updated = True
 
         if updated:
-            self.updated_at = datetime.now(timezone.utc)
+            now = _utcnow()
+            self.updated_at = now
             if self._check_completion():
                 self.is_completed = True
-                self.completed_at = datetime.now(timezone.utc)
+                self.completed_at = now
 
         return updated
 
+    @classmethod
+    def bulk_increment(cls, user_id: uuid.UUID,
+                       deltas: Dict[uuid.UUID, ProgressDelta]) -> List["UserAchievement"]:
+        """Add progress deltas to many achievements of one user in a single UPDATE.
+
+        Completion is evaluated in SQL against each achievement's thresholds.
+        """
+        if not deltas:
+            return []
+        payload = [
+            {"achievement_id": str(achievement_id), "amount": str(delta.amount), "count": delta.count}
+            for achievement_id, delta in deltas.items()
+        ]
+        response = supabase.rpc("bulk_increment_achievements", {
+            "p_user_id": str(user_id),
+            "p_deltas": payload,
+        }).execute()
+        rows = response.data or []
+        if not rows:
+            return []
+
+        # Thresholds live on the parent achievements; fetch them in one query so
+        # progress_percentage and later in-process completion checks have targets
+        thresholds = {
+            row["achievement_id"]: row
+            for row in (supabase.table("achievements")
+                        .select("achievement_id,threshold_amount,threshold_count")
+                        .in_("achievement_id", list({row["achievement_id"] for row in rows}))
+                        .execute().data or [])
+        }
+        achievements = []
+        for row in rows:
+            achievement = cls(**row)
+            target = thresholds.get(row["achievement_id"])
+            if target:
+                amount = target.get("threshold_amount")
+                achievement.set_targets(
+                    target_amount=Decimal(str(amount)) if amount is not None else None,
+                    target_count=target.get("threshold_count"),
+                )
+            achievements.append(achievement)
+        return achievements
+
     def _check_completion(self) -> bool:
         """Check if achievement is completed based on requirements"""
         if self.is_completed:
             return True
-
-        try:
-            target_amount = getattr(self, '_target_amount', None)
-            target_count = getattr(self, '_target_count', None)
-
-            if target_amount and self.current_amount >= target_amount:
-                return True
-            if target_count and self.current_count >= target_count:
-                return True
-            return False
-        except AttributeError:
-            return False
+        target_amount_f = self._target_amount_f
+        if target_amount_f is not None and float(self.current_amount) >= target_amount_f:
+            return True
+        target_count = self._target_count
+        return target_count is not None and self.current_count >= target_count
 
     def sync_to_google_play(self) -> None:
         """Mark achievement as synced to Google Play Games"""
         if not self.synced_to_google_play:
             self.synced_to_google_play = True
-            self.google_play_sync_at = datetime.now(timezone.utc)
-            self.updated_at = datetime.now(timezone.utc)
+            self.google_play_sync_at = self.updated_at = _utcnow()
 
     def reset_streak(self) -> None:
         """Reset the current streak to zero"""
         if self.current_streak > 0:
             self.current_streak = 0
-            self.updated_at = datetime.now(timezone.utc)
+            self.updated_at = _utcnow()
+
+    def _progress_dto(self) -> UserAchievementDTO:
+        # Internal state is already validated, so skip validation on the snapshot
+        return UserAchievementDTO.model_construct(
+            current_amount=float(self.current_amount),
+            current_count=self.current_count,
+            current_streak=self.current_streak,
+            progress_percentage=self.progress_percentage,
+            progress=self.progress,
+            is_completed=self.is_completed,
+            completed_at=self.completed_at,
+            synced_to_google_play=self.synced_to_google_play,
+            google_play_sync_at=self.google_play_sync_at,
+        )
 
     def get_detailed_progress(self) -> Dict[str, Any]:
         """Get detailed progress information including streak and sync status"""
-        return {
-            'current_amount': float(self.current_amount),
-            'current_count': self.current_count,
-            'current_streak': self.current_streak,
-            'progress_percentage': self.progress_percentage,
-            'progress': self.progress,
-            'is_completed': self.is_completed,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'synced_to_google_play': self.synced_to_google_play,
-            'google_play_sync_at': self.google_play_sync_at.isoformat() if self.google_play_sync_at else None
-        }
+        return self._progress_dto().model_dump(mode="json")
 
+    def get_detailed_progress_json(self) -> str:
+        """Detailed progress serialized straight to JSON for API responses"""
+        return self._progress_dto().model_dump_json()
 
 class UserAchievementCreate(BaseModel):
     """Schema for creating user achievement
@@ -147,10 +236,27 @@ class UserAchievementResponse(BaseModel):
     updated_at: Optional[datetime]
     progress_percentage: float
 
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
 
 class UserAchievementListResponse(BaseModel):
     """Response for listing user achievements"""
-    achievements: list[UserAchievementResponse]
+    achievements: list[UserAchievementResponse] = Field(default_factory=list)
     total_count: int
     page: int = 1
-    page_size: int = 20
\ No newline at end of file
+    page_size: int = 20
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+_USER_ACHIEVEMENT_LIST_ADAPTER = TypeAdapter(List[UserAchievementResponse])
+
+
+def dump_user_achievement_list(items: List[UserAchievementResponse]) -> List[Dict[str, Any]]:
+    """Serialize a list of user achievements in one pass with the prebuilt serializer"""
+    return _USER_ACHIEVEMENT_LIST_ADAPTER.dump_python(items, mode="json")
+
+
+def dump_user_achievement_list_json(items: List[UserAchievementResponse]) -> bytes:
+    """Serialize a list of user achievements straight to JSON with the prebuilt serializer"""
+    return _USER_ACHIEVEMENT_LIST_ADAPTER.dump_json(items)
@@ -3,27 +3,65 @@ AI Advisor Service - Chatbot Training & Financial Advice
 Handles conversation management, context, and financial recommendations
 """
 import logging
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Optional, Any
 from datetime import datetime, timedelta
+from functools import cache, lru_cache
+import copy
+import hashlib
 import json
 
-from langchain.chat_models import ChatOpenAI
-from langchain.memory import ConversationBufferWindowMemory
+from cachetools import LRUCache, TTLCache
+from langchain_openai import ChatOpenAI
+from langchain.memory import ConversationSummaryBufferMemory
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
-import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from pydantic import BaseModel, Field
 
 from app.core.settings import get_settings
+from app.core.openai_client import openai_http_clients
 from app.db.repositories import TransactionRepository, BudgetRepository
 from app.models.user import User
 from app.schemas.ai_advisor import ChatRequest, ChatResponse, FinancialAdviceRequest
 from app.utils.financial_calculations import FinancialCalculator
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Per-user conversation memory: recent turns verbatim, older ones folded into a summary
+MEMORY_MAX_TOKENS = 800
+MAX_CACHED_MEMORIES = 10_000
+MEMORY_IDLE_TTL_SECONDS = 3600
+
+# Conversation summaries memoized by a hash of the transcript they were generated from
+MAX_CACHED_SUMMARIES = 1024
+
+# Spending analysis per user, reused until the user's transactions change
+MAX_CACHED_ANALYSES = 10_000
+ANALYSIS_TTL_SECONDS = 900
+
+# Texts per encoder forward pass when embedding in bulk
+EMBED_BATCH_SIZE = 32
+
+@lru_cache(maxsize=1)
+def _get_embedder() -> "SentenceTransformer":
+    """Load the sentence embedding model once per process, on first use"""
+    # Imported here: sentence_transformers pulls in torch, too heavy to pay for at worker startup
+    from sentence_transformers import SentenceTransformer
+    
+    return SentenceTransformer('all-MiniLM-L6-v2')
+
+
+class AdviceResult(BaseModel):
+    """Structured advice returned by the model in a single call"""
+    advice: str = Field(description="Personalized financial advice, at most 300 words")
+    action_items: List[str] = Field(
+        description="3-5 concrete actions for this week, each starting with an action verb"
+    )
+
 
 class AIAdvisorService:
     """
@@ -34,14 +72,24 @@ class AIAdvisorService:
         self.llm = ChatOpenAI(
             model="gpt-4-turbo-preview",
             temperature=0.7,
-            openai_api_key=settings.OPENAI_API_KEY
+            openai_api_key=settings.OPENAI_API_KEY,
+            **openai_http_clients()
+        )
+        # Advice and its action items come back together from one function-calling request
+        self.advice_llm = self.llm.with_structured_output(AdviceResult)
+        
+        # Cheaper model for summarization: memory compression and conversation summaries
+        self.summary_llm = ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            openai_api_key=settings.OPENAI_API_KEY,
+            **openai_http_clients()
         )
         
-        # Conversation memory per user (limited window for mobile efficiency)
-        self.user_memories: Dict[str, ConversationBufferWindowMemory] = {}
-        
-        # Financial context embeddings for better responses
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Conversation memory per user; idle conversations expire and the least recently used go first when full
+        self.user_memories: TTLCache = TTLCache(maxsize=MAX_CACHED_MEMORIES, ttl=MEMORY_IDLE_TTL_SECONDS)
+        self.summary_cache: LRUCache = LRUCache(maxsize=MAX_CACHED_SUMMARIES)
+        self.analysis_cache: TTLCache = TTLCache(maxsize=MAX_CACHED_ANALYSES, ttl=ANALYSIS_TTL_SECONDS)
         
         # Financial advisor prompt template
         self.chat_prompt = ChatPromptTemplate.from_messages([
@@ -50,9 +98,29 @@ class AIAdvisorService:
             ("human", "{user_input}")
         ])
         
+        # Conversation chain, composed once and reused for every chat turn
+        self.chat_chain = self.chat_prompt | self.llm
+        
         self.financial_calculator = FinancialCalculator()
         
-    def _get_system_prompt(self) -> str:
+    @property
+    def embedding_model(self) -> "SentenceTransformer":
+        """Financial context embeddings for better responses (shared, lazily loaded)"""
+        return _get_embedder()
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts in batched encoder passes; rows are L2-normalized so cosine similarity is a matmul"""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=EMBED_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+    
+    @staticmethod
+    @cache
+    def _get_system_prompt() -> str:
         """Get the system prompt for the AI financial advisor"""
         return """You are SpendyWise, an expert AI financial advisor and personal finance coach.
         
@@ -109,9 +177,8 @@ Always prioritize:
                 user_id, enhanced_message, memory
             )
             
-            # Store conversation in memory
-            memory.chat_memory.add_user_message(message)
-            memory.chat_memory.add_ai_message(response)
+            # Store conversation in memory (summarizes older turns past the token limit)
+            await memory.asave_context({"input": message}, {"output": response})
             
             # Generate suggested follow-up questions
             suggestions = await self._generate_suggestions(response, financial_context)
@@ -132,6 +199,40 @@ Always prioritize:
                 conversation_id=user_id
             )
     
+    async def stream_chat_with_user(
+        self, 
+        user_id: str, 
+        message: str,
+        financial_context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the reply to a chat message as the model generates it, for server-streaming RPCs
+        """
+        parts: List[str] = []
+        try:
+            memory = self._get_user_memory(user_id)
+            
+            enhanced_message = await self._enhance_message_with_context(
+                message, financial_context
+            )
+            chat_history = (await memory.aload_memory_variables({}))["chat_history"]
+            
+            async for chunk in self.chat_chain.astream({
+                "user_input": enhanced_message,
+                "chat_history": chat_history
+            }):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+            
+            # Only the complete reply is stored, once the stream has closed
+            await memory.asave_context({"input": message}, {"output": "".join(parts)})
+            
+        except Exception as e:
+            logger.error(f"Error in stream_chat_with_user: {str(e)}")
+            if not parts:
+                yield "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+    
     async def get_financial_advice(
         self, 
         user: User,
@@ -145,33 +246,41 @@ Always prioritize:
             financial_data = await self._gather_financial_data(user.id)
             
             # Analyze spending patterns
-            spending_analysis = await self._analyze_spending_patterns(financial_data)
+            spending_analysis = await self._analyze_spending_patterns(user.id, financial_data)
             
-            # Generate personalized recommendations
+            # Calculate financial health score
+            health_score = await self._calculate_financial_health_score(financial_data)
+            
+            # Generate personalized recommendations and action items in one call
             recommendations = await self._generate_recommendations(
                 user, financial_data, spending_analysis, request
             )
             
             return {
-                "advice": recommendations,
+                "advice": recommendations.advice,
                 "analysis": spending_analysis,
-                "action_items": await self._generate_action_items(recommendations),
-                "financial_health_score": await self._calculate_financial_health_score(financial_data)
+                "action_items": recommendations.action_items[:5],  # Limit for mobile display
+                "financial_health_score": health_score
             }
             
         except Exception as e:
             logger.error(f"Error generating financial advice: {str(e)}")
             raise
     
-    def _get_user_memory(self, user_id: str) -> ConversationBufferWindowMemory:
-        """Get or create conversation memory for user (mobile-optimized)"""
-        if user_id not in self.user_memories:
-            self.user_memories[user_id] = ConversationBufferWindowMemory(
-                k=10,  # Keep last 10 messages for mobile efficiency
+    def _get_user_memory(self, user_id: str) -> ConversationSummaryBufferMemory:
+        """Get or create conversation memory for user (token-bounded for mobile efficiency)"""
+        memory = self.user_memories.get(user_id)
+        if memory is None:
+            memory = self.user_memories[user_id] = ConversationSummaryBufferMemory(
+                llm=self.summary_llm,
+                max_token_limit=MEMORY_MAX_TOKENS,
                 return_messages=True,
                 memory_key="chat_history"
             )
-        return self.user_memories[user_id]
+        else:
+            # Re-insert to restart the idle timer; writes also purge entries that have expired
+            self.user_memories[user_id] = memory
+        return memory
     
     async def _enhance_message_with_context(
         self, 
@@ -203,18 +312,15 @@ Always prioritize:
         self, 
         user_id: str, 
         message: str, 
-        memory: ConversationBufferWindowMemory
+        memory: ConversationSummaryBufferMemory
     ) -> str:
         """Generate AI response using conversation chain"""
         
-        # Get chat history from memory
-        chat_history = memory.chat_memory.messages
-        
-        # Create the conversation chain
-        chain = self.chat_prompt | self.llm
+        # Get chat history from memory (running summary + recent messages)
+        chat_history = (await memory.aload_memory_variables({}))["chat_history"]
         
         # Generate response
-        response = await chain.ainvoke({
+        response = await self.chat_chain.ainvoke({
             "user_input": message,
             "chat_history": chat_history
         })
@@ -254,52 +360,67 @@ Always prioritize:
             "debts": []
         }
     
-    async def _analyze_spending_patterns(self, financial_data: Dict) -> Dict[str, Any]:
-        """Analyze user's spending patterns using pandas/numpy"""
-        if not financial_data.get("transactions"):
+    async def _analyze_spending_patterns(self, user_id: str, financial_data: Dict) -> Dict[str, Any]:
+        """Analyze user's spending patterns with vectorized numpy reductions"""
+        transactions = financial_data.get("transactions")
+        if not transactions:
             return {"status": "insufficient_data"}
         
-        # Convert to DataFrame for analysis
-        df = pd.DataFrame(financial_data["transactions"])
+        # Reuse the analysis while the transactions are unchanged; the digest covers every field,
+        # so inserts, deletes and in-place edits all invalidate it
+        watermark = hashlib.blake2b(
+            json.dumps(transactions, sort_keys=True, default=str).encode(), digest_size=16
+        ).digest()
+        cached = self.analysis_cache.get(user_id)
+        if cached is not None and cached[0] == watermark:
+            return copy.deepcopy(cached[1])
+        
+        amounts = np.fromiter(
+            (t["amount"] for t in transactions), dtype=np.float64, count=len(transactions)
+        )
         
         analysis = {
-            "total_spending": df["amount"].sum(),
-            "avg_daily_spending": df["amount"].mean(),
-            "spending_by_category": df.groupby("category")["amount"].sum().to_dict(),
-            "spending_trend": self._calculate_trend(df),
-            "unusual_spending": self._detect_unusual_spending(df)
+            "total_spending": float(amounts.sum()),
+            "avg_daily_spending": float(amounts.mean()),
+            "spending_by_category": self.financial_calculator.spending_by_category(transactions, amounts),
+            "spending_trend": self._calculate_trend(amounts),
+            "unusual_spending": self._detect_unusual_spending(transactions, amounts)
         }
         
+        # Cache a private copy so callers can neither mutate it nor share their transaction dicts with it
+        self.analysis_cache[user_id] = (watermark, copy.deepcopy(analysis))
         return analysis
     
-    def _calculate_trend(self, df: pd.DataFrame) -> str:
+    def _calculate_trend(self, amounts: np.ndarray) -> str:
         """Calculate spending trend over time"""
-        if len(df) < 7:
+        if len(amounts) < 7:
             return "insufficient_data"
         
-        # Simple trend calculation
-        recent_avg = df.tail(7)["amount"].mean()
-        older_avg = df.head(7)["amount"].mean()
+        # Least-squares slope over the whole series, as a fraction of the mean over its span
+        mean_amount = amounts.mean()
+        if mean_amount <= 0:
+            return "stable"
+        n = len(amounts)
+        x = np.arange(n, dtype=np.float64)
+        x -= x.mean()
+        slope = np.dot(x, amounts - mean_amount) / np.dot(x, x)
+        relative_change = slope * n / mean_amount
         
-        if recent_avg > older_avg * 1.1:
+        if relative_change > 0.1:
             return "increasing"
-        elif recent_avg < older_avg * 0.9:
+        elif relative_change < -0.1:
             return "decreasing"
         else:
             return "stable"
     
-    def _detect_unusual_spending(self, df: pd.DataFrame) -> List[Dict]:
+    def _detect_unusual_spending(self, transactions: List[Dict], amounts: np.ndarray) -> List[Dict]:
         """Detect unusual spending patterns"""
-        if len(df) < 10:
+        if len(amounts) < 10:
             return []
         
-        # Statistical outlier detection
-        mean_amount = df["amount"].mean()
-        std_amount = df["amount"].std()
-        threshold = mean_amount + (2 * std_amount)
-        
-        unusual = df[df["amount"] > threshold]
-        return unusual.to_dict("records")
+        # Statistical outlier detection (sample std, as before)
+        threshold = amounts.mean() + (2 * amounts.std(ddof=1))
+        return [transactions[i] for i in np.flatnonzero(amounts > threshold)]
     
     async def _generate_recommendations(
         self, 
@@ -307,8 +428,8 @@ Always prioritize:
         financial_data: Dict,
         analysis: Dict,
         request: FinancialAdviceRequest
-    ) -> str:
-        """Generate personalized financial recommendations"""
+    ) -> AdviceResult:
+        """Generate personalized financial recommendations with their action items"""
         
         prompt = f"""
         Generate personalized financial advice for a user with the following profile:
@@ -324,32 +445,12 @@ Always prioritize:
         5. Long-term financial planning
         
         Keep advice practical and motivating. Limit to 300 words for mobile readability.
-        """
-        
-        response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-        return response.content
-    
-    async def _generate_action_items(self, recommendations: str) -> List[str]:
-        """Extract actionable items from recommendations"""
-        prompt = f"""
-        Extract 3-5 specific, actionable items from this financial advice:
-        
-        {recommendations}
         
-        Format as a simple list of concrete actions the user can take this week.
+        Also list 3-5 specific action items the user can take this week.
         Each item should start with an action verb and be achievable.
         """
         
-        response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-        
-        # Parse response into list
-        actions = [
-            line.strip() 
-            for line in response.content.split('\n') 
-            if line.strip() and (line.strip().startswith('-') or line.strip().startswith('•'))
-        ]
-        
-        return actions[:5]  # Limit for mobile display
+        return await self.advice_llm.ainvoke([HumanMessage(content=prompt)])
     
     async def _calculate_financial_health_score(self, financial_data: Dict) -> int:
         """Calculate a simple financial health score (0-100)"""
@@ -379,11 +480,19 @@ Always prioritize:
         if not memory or not memory.chat_memory.messages:
             return None
         
-        # Generate summary using AI
+        # Generate summary using AI; older turns survive only in the running summary
         messages_text = "\n".join([
             f"{'User' if isinstance(msg, HumanMessage) else 'AI'}: {msg.content}"
             for msg in memory.chat_memory.messages
         ])
+        if memory.moving_summary_buffer:
+            messages_text = f"Earlier conversation (summarized): {memory.moving_summary_buffer}\n{messages_text}"
+        
+        # An unchanged transcript yields the same summary; skip the model round trip
+        cache_key = hashlib.blake2b(messages_text.encode(), digest_size=16).hexdigest()
+        cached = self.summary_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         prompt = f"""
         Summarize this financial conversation in 2-3 sentences:
@@ -393,5 +502,6 @@ Always prioritize:
         Focus on the user's main concerns and the advice given.
         """
         
-        response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+        response = await self.summary_llm.ainvoke([HumanMessage(content=prompt)])
+        self.summary_cache[cache_key] = response.content
         return response.content
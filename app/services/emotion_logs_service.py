@@ -7,17 +7,27 @@ from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta, date
 from uuid import UUID
 import asyncio
+from collections import Counter
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, case, tuple_
 
 from app.models.emotion_logs import EmotionLog
 from app.schemas.emotion_logs import EmotionLogCreate, EmotionLogUpdate
-from app.core.constants import EmotionCheckin, EmotionTrigger
+from app.core.constants import EmotionCheckin, EmotionTrigger, POSITIVE_EMOTIONS, NEGATIVE_EMOTIONS
 from app.db.session import get_db
 
 logger = logging.getLogger(__name__)
 
+# SQL-side valence flags so aggregations can count positive/negative logs in the database
+_IS_POSITIVE = EmotionLog.emotion_checkin.in_(POSITIVE_EMOTIONS)
+_IS_NEGATIVE = EmotionLog.emotion_checkin.in_(NEGATIVE_EMOTIONS)
+
+
+def _emotion_value(emotion: Any) -> str:
+    """Plain string value of an emotion_checkin, whether loaded as an EmotionCheckin or a str"""
+    return getattr(emotion, "value", emotion)
+
 
 class EmotionLogService:
     """Service for managing emotion logs and mental health tracking"""
@@ -54,23 +64,35 @@ class EmotionLogService:
         ).first()
     
     def list_user_emotion_logs(self, user_id: UUID, page: int = 1, page_size: int = 20,
-                             start_date: Optional[date] = None, end_date: Optional[date] = None) -> tuple[List[EmotionLog], int]:
-        """List emotion logs for a user with optional date filtering"""
-        query = self.db.query(EmotionLog).filter(EmotionLog.user_id == user_id)
+                             start_date: Optional[date] = None, end_date: Optional[date] = None,
+                             before: Optional[tuple[datetime, UUID]] = None) -> tuple[List[EmotionLog], int]:
+        """List emotion logs for a user with optional date filtering
         
-        # Apply date filters if provided
+        Pass ``(logged_at, emotion_log_id)`` of the last row seen as ``before`` to page
+        by keyset instead of OFFSET; ``page`` is ignored in that case and the total
+        counts the logs after the cursor. The id breaks ties between equal timestamps.
+        """
+        # The total rides along as a window column so one round trip returns page and count
+        query = self.db.query(EmotionLog, func.count().over().label('total')).filter(EmotionLog.user_id == user_id)
+        
+        # Apply date filters if provided; end_date is inclusive, so stop before the next midnight
         if start_date:
-            query = query.filter(EmotionLog.logged_at >= start_date)
+            query = query.filter(EmotionLog.logged_at >= datetime.combine(start_date, datetime.min.time()))
         if end_date:
-            query = query.filter(EmotionLog.logged_at <= end_date + timedelta(days=1))
+            query = query.filter(EmotionLog.logged_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
         
-        total_count = query.count()
+        if before:
+            paged = query.filter(tuple_(EmotionLog.logged_at, EmotionLog.emotion_log_id) < tuple_(*before))
+        else:
+            paged = query.offset((page - 1) * page_size)
         
-        emotions = query.order_by(desc(EmotionLog.logged_at)).offset(
-            (page - 1) * page_size
-        ).limit(page_size).all()
+        rows = paged.order_by(desc(EmotionLog.logged_at), desc(EmotionLog.emotion_log_id)).limit(page_size).all()
         
-        return emotions, total_count
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        # Past the last page no row carries the window total, so count separately
+        total_count = query.count() if page > 1 and not before else 0
+        return [], total_count
     
     def get_recent_emotions(self, user_id: UUID, days: int = 7) -> List[EmotionLog]:
         """Get recent emotion logs for a user"""
@@ -86,15 +108,19 @@ class EmotionLogService:
     def get_emotion_stats(self, user_id: UUID, days: int = 30) -> Dict[str, Any]:
         """Get emotion statistics for a user"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
+        window = and_(
+            EmotionLog.user_id == user_id,
+            EmotionLog.logged_at >= cutoff_date
+        )
         
-        emotions = self.db.query(EmotionLog).filter(
-            and_(
-                EmotionLog.user_id == user_id,
-                EmotionLog.logged_at >= cutoff_date
-            )
-        ).all()
+        total_logs, average_intensity, positive_count, negative_count = self.db.query(
+            func.count(),
+            func.avg(EmotionLog.intensity),
+            func.sum(case((_IS_POSITIVE, 1), else_=0)),
+            func.sum(case((_IS_NEGATIVE, 1), else_=0))
+        ).filter(window).one()
         
-        if not emotions:
+        if not total_logs:
             return {
                 "total_logs": 0,
                 "emotion_distribution": {},
@@ -106,43 +132,30 @@ class EmotionLogService:
                 "most_common_trigger": None
             }
         
-        # Calculate distributions
-        emotion_counts = {}
-        trigger_counts = {}
-        intensities = []
-        positive_count = 0
-        negative_count = 0
-        
-        for emotion in emotions:
-            # Emotion distribution
-            emotion_type = emotion.emotion_checkin
-            emotion_counts[emotion_type] = emotion_counts.get(emotion_type, 0) + 1
-            
-            # Trigger distribution
-            if emotion.emotion_trigger:
-                trigger_counts[emotion.emotion_trigger] = trigger_counts.get(emotion.emotion_trigger, 0) + 1
-            
-            # Intensity
-            if emotion.intensity:
-                intensities.append(emotion.intensity)
-            
-            # Positive/negative classification
-            if emotion.is_positive_emotion:
-                positive_count += 1
-            elif emotion.is_negative_emotion:
-                negative_count += 1
-        
-        total_logs = len(emotions)
+        # Distributions come back already grouped: one row per distinct value
+        emotion_counts = Counter(dict(
+            self.db.query(EmotionLog.emotion_checkin, func.count())
+            .filter(window)
+            .group_by(EmotionLog.emotion_checkin)
+            .all()
+        ))
+        trigger_counts = Counter(dict(
+            self.db.query(EmotionLog.emotion_trigger, func.count())
+            .filter(window, EmotionLog.emotion_trigger.isnot(None))
+            .group_by(EmotionLog.emotion_trigger)
+            .all()
+        ))
+        percent = 100 / total_logs
         
         return {
             "total_logs": total_logs,
             "emotion_distribution": emotion_counts,
             "trigger_distribution": trigger_counts,
-            "average_intensity": sum(intensities) / len(intensities) if intensities else 0,
-            "positive_emotion_percentage": (positive_count / total_logs * 100) if total_logs > 0 else 0,
-            "negative_emotion_percentage": (negative_count / total_logs * 100) if total_logs > 0 else 0,
-            "most_common_emotion": max(emotion_counts, key=emotion_counts.get) if emotion_counts else None,
-            "most_common_trigger": max(trigger_counts, key=trigger_counts.get) if trigger_counts else None,
+            "average_intensity": float(average_intensity) if average_intensity is not None else 0,
+            "positive_emotion_percentage": (positive_count or 0) * percent,
+            "negative_emotion_percentage": (negative_count or 0) * percent,
+            "most_common_emotion": emotion_counts.most_common(1)[0][0] if emotion_counts else None,
+            "most_common_trigger": trigger_counts.most_common(1)[0][0] if trigger_counts else None,
             "period_days": days
         }
     
@@ -174,31 +187,13 @@ class EmotionLogService:
             }
         
         spending_emotions = [e for e in money_emotions if e.transaction_id]
-        negative_money_emotions = [e for e in money_emotions if e.is_negative_emotion]
+        negative_money_emotions = [
+            e for e in money_emotions if _emotion_value(e.emotion_checkin) in NEGATIVE_EMOTIONS
+        ]
         
         # Calculate emotional spending risk
         negative_percentage = (len(negative_money_emotions) / len(money_emotions)) * 100 if money_emotions else 0
-        
-        if negative_percentage > 60:
-            risk_level = "high"
-            recommendations = [
-                "Consider implementing a cooling-off period before large purchases",
-                "Practice mindfulness before spending decisions",
-                "Seek support if financial stress is overwhelming"
-            ]
-        elif negative_percentage > 30:
-            risk_level = "moderate"
-            recommendations = [
-                "Try to identify emotional spending triggers",
-                "Consider budgeting techniques to reduce financial stress",
-                "Practice emotional regulation techniques"
-            ]
-        else:
-            risk_level = "low"
-            recommendations = [
-                "Continue monitoring emotional patterns",
-                "Maintain healthy spending habits"
-            ]
+        risk_level, recommendations = self._spending_risk(negative_percentage)
         
         return {
             "total_money_emotions": len(money_emotions),
@@ -214,73 +209,78 @@ class EmotionLogService:
         """Get emotion trends over time"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        emotions = self.db.query(EmotionLog).filter(
+        # Postgres weeks start on Monday, matching the previous weekday()-based bucketing
+        week = func.date_trunc('week', EmotionLog.logged_at).label('week')
+        rows = self.db.query(
+            week,
+            func.sum(case((_IS_POSITIVE, 1), else_=0)),
+            func.sum(case((_IS_NEGATIVE, 1), else_=0)),
+            func.count(),
+            func.avg(EmotionLog.intensity)
+        ).filter(
             and_(
                 EmotionLog.user_id == user_id,
                 EmotionLog.logged_at >= cutoff_date
             )
-        ).order_by(EmotionLog.logged_at).all()
+        ).group_by(week).order_by(week).all()
         
-        if not emotions:
+        if not rows:
             return {"trend": "no_data", "weekly_breakdown": {}}
         
-        # Group by week
-        weekly_breakdown = {}
-        
-        for emotion in emotions:
-            week_start = emotion.logged_at.date() - timedelta(days=emotion.logged_at.weekday())
-            week_key = week_start.isoformat()
-            
-            if week_key not in weekly_breakdown:
-                weekly_breakdown[week_key] = {
-                    "positive_count": 0,
-                    "negative_count": 0,
-                    "neutral_count": 0,
-                    "total_count": 0,
-                    "average_intensity": 0,
-                    "intensities": []
-                }
-            
-            weekly_breakdown[week_key]["total_count"] += 1
-            
-            if emotion.is_positive_emotion:
-                weekly_breakdown[week_key]["positive_count"] += 1
-            elif emotion.is_negative_emotion:
-                weekly_breakdown[week_key]["negative_count"] += 1
-            else:
-                weekly_breakdown[week_key]["neutral_count"] += 1
-            
-            if emotion.intensity:
-                weekly_breakdown[week_key]["intensities"].append(emotion.intensity)
-        
-        # Calculate average intensities
-        for week_data in weekly_breakdown.values():
-            if week_data["intensities"]:
-                week_data["average_intensity"] = sum(week_data["intensities"]) / len(week_data["intensities"])
-            del week_data["intensities"]  # Remove raw intensities from response
-        
-        # Determine overall trend
-        weeks = sorted(weekly_breakdown.keys())
-        if len(weeks) >= 2:
-            recent_positive_rate = weekly_breakdown[weeks[-1]]["positive_count"] / max(1, weekly_breakdown[weeks[-1]]["total_count"])
-            earlier_positive_rate = weekly_breakdown[weeks[0]]["positive_count"] / max(1, weekly_breakdown[weeks[0]]["total_count"])
-            
-            if recent_positive_rate > earlier_positive_rate + 0.1:
-                trend = "improving"
-            elif recent_positive_rate < earlier_positive_rate - 0.1:
-                trend = "declining"
-            else:
-                trend = "stable"
-        else:
-            trend = "insufficient_data"
+        weekly_breakdown = {
+            week_start.date().isoformat(): {
+                "positive_count": positive_count,
+                "negative_count": negative_count,
+                "neutral_count": total_count - positive_count - negative_count,
+                "total_count": total_count,
+                "average_intensity": float(average_intensity) if average_intensity is not None else 0
+            }
+            for week_start, positive_count, negative_count, total_count, average_intensity in rows
+        }
         
         return {
-            "trend": trend,
+            "trend": self._classify_trend(weekly_breakdown),
             "weekly_breakdown": weekly_breakdown,
-            "total_weeks": len(weeks),
+            "total_weeks": len(weekly_breakdown),
             "period_days": days
         }
     
+    @staticmethod
+    def _classify_trend(weekly_breakdown: Dict[str, Dict[str, Any]]) -> str:
+        """Compare the positive-emotion rate of the first and last week"""
+        weeks = sorted(weekly_breakdown.keys())
+        if len(weeks) < 2:
+            return "insufficient_data"
+        
+        recent_positive_rate = weekly_breakdown[weeks[-1]]["positive_count"] / max(1, weekly_breakdown[weeks[-1]]["total_count"])
+        earlier_positive_rate = weekly_breakdown[weeks[0]]["positive_count"] / max(1, weekly_breakdown[weeks[0]]["total_count"])
+        
+        if recent_positive_rate > earlier_positive_rate + 0.1:
+            return "improving"
+        if recent_positive_rate < earlier_positive_rate - 0.1:
+            return "declining"
+        return "stable"
+    
+    @staticmethod
+    def _spending_risk(negative_percentage: float) -> tuple[str, List[str]]:
+        """Map the share of negative money-related emotions to a risk level and recommendations"""
+        if negative_percentage > 60:
+            return "high", [
+                "Consider implementing a cooling-off period before large purchases",
+                "Practice mindfulness before spending decisions",
+                "Seek support if financial stress is overwhelming"
+            ]
+        if negative_percentage > 30:
+            return "moderate", [
+                "Try to identify emotional spending triggers",
+                "Consider budgeting techniques to reduce financial stress",
+                "Practice emotional regulation techniques"
+            ]
+        return "low", [
+            "Continue monitoring emotional patterns",
+            "Maintain healthy spending habits"
+        ]
+    
     def update_emotion_log(self, user_id: UUID, emotion_log_id: UUID, update_data: EmotionLogUpdate) -> Optional[EmotionLog]:
         """Update an emotion log entry"""
         emotion_log = self.get_emotion_log(user_id, emotion_log_id)
@@ -314,26 +314,75 @@ class EmotionLogService:
         return True
     
     def get_emotion_insights_for_ai(self, user_id: UUID, days: int = 14) -> Dict[str, Any]:
-        """Get emotion insights formatted for AI advisor context"""
-        emotion_stats = self.get_emotion_stats(user_id, days)
-        spending_emotions = self.analyze_spending_emotions(user_id, days)
-        trends = self.get_emotion_trends(user_id, days)
+        """Get emotion insights formatted for AI advisor context
+        
+        Runs a single query grouped by (week, emotion) that carries every aggregate the
+        summary needs, instead of calling the stats, spending and trend methods in turn.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        is_money = or_(
+            EmotionLog.emotion_trigger == EmotionTrigger.MONEY.value,
+            EmotionLog.transaction_id.isnot(None)
+        )
+        week = func.date_trunc('week', EmotionLog.logged_at).label('week')
+        rows = self.db.query(
+            week,
+            EmotionLog.emotion_checkin,
+            func.count(),
+            func.sum(EmotionLog.intensity),
+            func.count(EmotionLog.intensity),
+            func.sum(case((is_money, 1), else_=0)),
+            func.sum(case((and_(is_money, _IS_NEGATIVE), 1), else_=0))
+        ).filter(
+            and_(
+                EmotionLog.user_id == user_id,
+                EmotionLog.logged_at >= cutoff_date
+            )
+        ).group_by(week, EmotionLog.emotion_checkin).all()
+        
+        total_logs = positive_count = intensity_sum = intensity_count = 0
+        money_count = negative_money_count = 0
+        emotion_counts: Counter = Counter()
+        weekly_breakdown: Dict[str, Dict[str, Any]] = {}
+        
+        for week_start, emotion, count, week_intensity_sum, week_intensity_count, money, negative_money in rows:
+            emotion = _emotion_value(emotion)
+            is_positive = emotion in POSITIVE_EMOTIONS
+            
+            total_logs += count
+            positive_count += count if is_positive else 0
+            intensity_sum += week_intensity_sum or 0
+            intensity_count += week_intensity_count
+            money_count += money
+            negative_money_count += negative_money
+            emotion_counts[emotion] += count
+            
+            bucket = weekly_breakdown.setdefault(week_start.date().isoformat(), {"positive_count": 0, "total_count": 0})
+            bucket["total_count"] += count
+            bucket["positive_count"] += count if is_positive else 0
+        
+        if money_count:
+            negative_money_percentage = round(negative_money_count / money_count * 100, 1)
+            risk_level, recommendations = self._spending_risk(negative_money_percentage)
+        else:
+            negative_money_percentage = 0
+            risk_level, recommendations = "low", ["Continue tracking emotions to build insights"]
         
         return {
             "emotional_state_summary": {
-                "dominant_emotion": emotion_stats.get("most_common_emotion"),
-                "positive_percentage": emotion_stats.get("positive_emotion_percentage", 0),
-                "average_intensity": emotion_stats.get("average_intensity", 0),
-                "trend": trends.get("trend", "unknown")
+                "dominant_emotion": emotion_counts.most_common(1)[0][0] if emotion_counts else None,
+                "positive_percentage": positive_count / total_logs * 100 if total_logs else 0,
+                "average_intensity": float(intensity_sum) / intensity_count if intensity_count else 0,
+                "trend": self._classify_trend(weekly_breakdown) if weekly_breakdown else "no_data"
             },
             "financial_emotional_health": {
-                "money_related_emotions": spending_emotions.get("total_money_emotions", 0),
-                "emotional_spending_risk": spending_emotions.get("emotional_spending_risk", "low"),
-                "negative_money_emotions_percentage": spending_emotions.get("negative_percentage", 0)
+                "money_related_emotions": money_count,
+                "emotional_spending_risk": risk_level,
+                "negative_money_emotions_percentage": negative_money_percentage
             },
-            "recommendations": spending_emotions.get("recommendations", []),
+            "recommendations": recommendations,
             "data_quality": {
-                "total_logs": emotion_stats.get("total_logs", 0),
-                "tracking_consistency": "good" if emotion_stats.get("total_logs", 0) > days * 0.3 else "needs_improvement"
+                "total_logs": total_logs,
+                "tracking_consistency": "good" if total_logs > days * 0.3 else "needs_improvement"
             }
         }
@@ -7,12 +7,26 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 
+import numpy as np
+
+# Bucket for transactions without a category
+UNCATEGORIZED = "uncategorized"
+
 
 class FinancialCalculator:
     """
     Comprehensive financial calculations for AI advisor recommendations
     """
     
+    @staticmethod
+    def spending_by_category(transactions: List[Dict], amounts: np.ndarray) -> Dict[str, float]:
+        """Total the amounts per category; transactions missing a category are grouped as uncategorized"""
+        categories, category_index = np.unique(
+            np.array([t.get("category") or UNCATEGORIZED for t in transactions]), return_inverse=True
+        )
+        category_totals = np.bincount(category_index, weights=amounts)
+        return dict(zip(categories.tolist(), category_totals.tolist()))
+    
     @staticmethod
     def calculate_emergency_fund_target(monthly_expenses: float, months: int = 6) -> float:
         """Calculate recommended emergency fund amount"""
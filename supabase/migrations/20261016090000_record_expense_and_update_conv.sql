@@ -0,0 +1,37 @@
+-- Record an expense extracted from a chat message and store the AI reply on the
+-- conversation in one round trip. Both statements share the function's transaction:
+-- if the conversation does not exist nothing is written and NULL is returned.
+CREATE OR REPLACE FUNCTION record_expense_and_update_conv(
+    p_user_id uuid,
+    p_conversation_id uuid,
+    p_amount numeric,
+    p_category text,
+    p_description text,
+    p_ai_response text,
+    p_response_type text,
+    p_context text
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_expense expenses%ROWTYPE;
+BEGIN
+    UPDATE ai_conversations
+       SET ai_response = p_ai_response,
+           response_type = p_response_type,
+           context = p_context,
+           updated_at = now()
+     WHERE conversation_id = p_conversation_id;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO expenses (user_id, amount, category, description, created_at, conversation_id)
+    VALUES (p_user_id, p_amount, p_category, p_description, now(), p_conversation_id)
+    RETURNING * INTO v_expense;
+
+    RETURN to_jsonb(v_expense);
+END;
+$$;
@@ -0,0 +1,30 @@
+-- Aggregate a user's AI conversation analytics server-side so the client
+-- receives a single row instead of every conversation.
+CREATE OR REPLACE FUNCTION conversation_analytics(p_user_id uuid)
+RETURNS TABLE (
+    total_conversations bigint,
+    avg_confidence_score double precision,
+    avg_user_rating double precision,
+    helpfulness_rate double precision,
+    most_common_contexts text[],
+    response_type_distribution jsonb
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        count(*),
+        avg(c.confidence_score)::double precision,
+        avg(c.user_rating)::double precision,
+        (count(*) FILTER (WHERE c.was_helpful))::double precision / NULLIF(count(*), 0),
+        (SELECT (array_agg(DISTINCT x.context::text))[1:3]
+           FROM ai_conversations x
+          WHERE x.user_id = p_user_id AND x.context IS NOT NULL),
+        (SELECT COALESCE(jsonb_object_agg(rt.response_type, rt.cnt), '{}'::jsonb)
+           FROM (SELECT y.response_type::text AS response_type, count(*) AS cnt
+                   FROM ai_conversations y
+                  WHERE y.user_id = p_user_id AND y.response_type IS NOT NULL
+                  GROUP BY y.response_type) rt)
+      FROM ai_conversations c
+     WHERE c.user_id = p_user_id;
+$$;
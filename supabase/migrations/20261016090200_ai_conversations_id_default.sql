@@ -0,0 +1,3 @@
+-- Generate conversation ids in the database; inserts read the id back from the returned row.
+ALTER TABLE ai_conversations
+    ALTER COLUMN conversation_id SET DEFAULT gen_random_uuid();
@@ -0,0 +1,18 @@
+-- Total a user's expenses for a budget window server-side; NULL filters are ignored.
+CREATE OR REPLACE FUNCTION sum_expenses(
+    p_user_id uuid,
+    p_category_id uuid,
+    p_start_date timestamptz,
+    p_end_date timestamptz
+)
+RETURNS numeric
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(sum(e.amount), 0)
+      FROM expenses e
+     WHERE e.user_id = p_user_id
+       AND (p_category_id IS NULL OR e.category_id = p_category_id)
+       AND (p_start_date IS NULL OR e.created_at >= p_start_date)
+       AND (p_end_date IS NULL OR e.created_at <= p_end_date);
+$$;
@@ -0,0 +1,16 @@
+-- Recompute a budget's spent_amount and status from its expenses and return the
+-- updated row, replacing the read / sum / update round trips.
+CREATE OR REPLACE FUNCTION recalc_budget_spent(p_budget_id uuid, p_user_id uuid)
+RETURNS SETOF budgets
+LANGUAGE sql
+AS $$
+    UPDATE budgets b
+       SET spent_amount = s.total,
+           status = CASE WHEN s.total > b.amount THEN 'overbudget' ELSE 'active' END,
+           updated_at = now()
+      FROM (SELECT sum_expenses(p_user_id, bb.category_id, bb.start_date, bb.end_date) AS total
+              FROM budgets bb
+             WHERE bb.budget_id = p_budget_id) s
+     WHERE b.budget_id = p_budget_id
+    RETURNING b.*;
+$$;
@@ -0,0 +1,37 @@
+-- Apply many progress deltas for one user in a single UPDATE and mark achievements
+-- whose amount/count threshold is now reached as completed. p_deltas is a JSON array
+-- of {"achievement_id", "amount", "count"} objects.
+CREATE OR REPLACE FUNCTION bulk_increment_achievements(p_user_id uuid, p_deltas jsonb)
+RETURNS SETOF user_achievements
+LANGUAGE sql
+AS $$
+    WITH d AS (
+        SELECT x.achievement_id,
+               COALESCE(x.amount, 0) AS amount,
+               COALESCE(x.count, 0) AS count,
+               a.threshold_amount,
+               a.threshold_count
+          FROM jsonb_to_recordset(p_deltas) AS x(achievement_id uuid, amount numeric, count integer)
+          JOIN achievements a ON a.achievement_id = x.achievement_id
+    ), n AS (
+        SELECT ua.user_achievement_id,
+               ua.current_amount + d.amount AS new_amount,
+               ua.current_count + d.count AS new_count,
+               ua.is_completed
+                 OR COALESCE(d.threshold_amount > 0 AND ua.current_amount + d.amount >= d.threshold_amount, false)
+                 OR COALESCE(d.threshold_count > 0 AND ua.current_count + d.count >= d.threshold_count, false)
+                 AS reached
+          FROM user_achievements ua
+          JOIN d ON d.achievement_id = ua.achievement_id
+         WHERE ua.user_id = p_user_id
+    )
+    UPDATE user_achievements ua
+       SET current_amount = n.new_amount,
+           current_count = n.new_count,
+           completed_at = CASE WHEN n.reached AND NOT ua.is_completed THEN now() ELSE ua.completed_at END,
+           is_completed = n.reached,
+           updated_at = now()
+      FROM n
+     WHERE ua.user_achievement_id = n.user_achievement_id
+    RETURNING ua.*;
+$$;
@@ -0,0 +1,5 @@
+-- Generate achievement ids in the database; inserts read the id back from the returned row.
+ALTER TABLE achievements
+    ALTER COLUMN achievement_id SET DEFAULT gen_random_uuid();
+ALTER TABLE user_achievements
+    ALTER COLUMN user_achievement_id SET DEFAULT gen_random_uuid();
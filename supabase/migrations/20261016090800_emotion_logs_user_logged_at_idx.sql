@@ -0,0 +1,3 @@
+-- Every emotion log read filters by user and a logged_at range, newest first.
+CREATE INDEX IF NOT EXISTS ix_emotion_logs_user_logged_at
+    ON emotion_logs (user_id, logged_at DESC);
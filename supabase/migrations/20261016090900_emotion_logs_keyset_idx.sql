@@ -0,0 +1,4 @@
+-- Keyset pagination orders by (logged_at, emotion_log_id); carry the id tie-breaker in the index.
+DROP INDEX IF EXISTS ix_emotion_logs_user_logged_at;
+CREATE INDEX IF NOT EXISTS ix_emotion_logs_user_logged_at
+    ON emotion_logs (user_id, logged_at DESC, emotion_log_id DESC);
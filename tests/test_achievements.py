@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+# Third-party dependencies of the model module; the module under test is imported normally
+pytest.importorskip("postgrest")
+pytest.importorskip("pydantic_settings")
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test.anon.key")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test.service.key")
+
+from app.core.constants import AchievementType  # noqa: E402
+from app.models import achievements  # noqa: E402
+
+
+class _RecordingTable:
+    def __init__(self):
+        self.payload = None
+
+    def insert(self, payload):
+        self.payload = payload
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": [{**self.payload, "achievement_id": "7d1c3b9e-9a44-4f57-8e0b-2f6a1c0d5e11"}]})()
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.achievements = _RecordingTable()
+
+    def table(self, name):
+        assert name == "achievements"
+        return self.achievements
+
+
+def test_create_achievement_payload_with_criteria_amount_is_json_serializable(monkeypatch):
+    client = _RecordingClient()
+    monkeypatch.setattr(achievements, "supabase", client)
+    data = achievements.AchievementCreate(
+        achievement_type=AchievementType.ROOKIE_STARTER,
+        description="Save your first 100",
+        category="savings",
+        criteria={"threshold_amount": 100},
+    )
+
+    achievements.AchievementModel.create_achievement(data)
+
+    payload = client.achievements.payload
+    json.dumps(payload)
+    assert payload["criteria"]["threshold_amount"] == "100"
@@ -0,0 +1,17 @@
+import numpy as np
+
+from app.utils.financial_calculations import FinancialCalculator, UNCATEGORIZED
+
+
+def test_spending_by_category_groups_missing_category_as_uncategorized():
+    transactions = [
+        {"amount": 100.0, "category": "food"},
+        {"amount": 50.0, "category": None},
+        {"amount": 25.0},
+        {"amount": 10.0, "category": "food"},
+    ]
+    amounts = np.array([t["amount"] for t in transactions], dtype=np.float64)
+
+    totals = FinancialCalculator.spending_by_category(transactions, amounts)
+
+    assert totals == {"food": 110.0, UNCATEGORIZED: 75.0}